@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from datetime import datetime
 import fitz  # PyMuPDF
 from dotenv import load_dotenv
 load_dotenv()
@@ -195,6 +196,162 @@ def render_sidebar():
         st.slider("temperature", 0.0, 1.0, 0.0, 0.1, key="grok_temp")
         st.slider("max_tokens", 1000, 16000, 10000, 1000, key="grok_max_tokens")
 
+MAX_RUN_HISTORY = 20
+MODELS_BY_ID = {m.id: m for ms in MODELS.values() for m in ms}
+
+def get_comparison_runs() -> dict:
+    """比較実行の履歴（run_id -> 実行結果）をセッションから取得"""
+    return st.session_state.setdefault("compare_runs", {})
+
+def get_run_label(run: dict) -> str:
+    """実行履歴の表示ラベル（未完了の実行はその旨を表示）"""
+    status = "" if run["done"] else " 未完了"
+    return (f"#{run['seq']} {run['started']:%H:%M:%S} "
+            f"({len(run['results'])}/{len(run['models'])}モデル{status}) {run['prompt']}")
+
+def get_run_model_ids(run: dict) -> list[str]:
+    """結果があり、現在のMODELSに存在するモデルIDのみ返す"""
+    return [mid for mid in run["models"] if mid in run["results"] and mid in MODELS_BY_ID]
+
+def run_comparison(selected: list[ModelConfig], prompt: str, params: dict, system_prompt: str = ""):
+    """比較を実行し、モデルごとに結果をセッションへ保存しながら逐次表示"""
+    runs = get_comparison_runs()
+    started = datetime.now()
+    seq = st.session_state.get("compare_run_seq", 0) + 1
+    st.session_state["compare_run_seq"] = seq
+    run_id = f"{started:%Y%m%d-%H%M%S-%f}-{seq}"
+    run = {
+        "seq": seq,
+        "started": started,
+        "prompt": prompt.strip()[:30],
+        "models": [m.id for m in selected],
+        "results": {},
+        "done": False,
+    }
+    runs[run_id] = run
+    # 途中で再実行されても、この実行が表示されるようにする
+    st.session_state["compare_run_id"] = run_id
+    # 古い履歴を破棄
+    while len(runs) > MAX_RUN_HISTORY:
+        runs.pop(next(iter(runs)))
+
+    progress_bar = st.progress(0, text="準備中...")
+    live = st.empty()
+    live_box = live.container()
+    charts_slot = live_box.empty()
+    live_box.subheader("📝 レスポンス")
+    responses = live_box.container()
+
+    for i, m in enumerate(selected):
+        progress_bar.progress(i / len(selected), text=f"{m.name} 生成中... ({i+1}/{len(selected)})")
+        r = run_generation(m, prompt, params, system_prompt)
+        run["results"][m.id] = r
+        # グラフ・表のみ再描画し、レスポンスは追記する（途中経過はキャッシュしない）
+        with charts_slot.container():
+            render_comparison_charts(run, get_run_model_ids(run), key_suffix=f"{run_id}_{i}", cached=False)
+        with responses:
+            render_response(m, r)
+
+    run["done"] = True
+    progress_bar.progress(1.0, text="完了")
+    live.empty()
+
+def make_comparison_charts(rows: tuple[tuple, ...]) -> tuple[pd.DataFrame, alt.LayerChart, alt.LayerChart]:
+    """グラフ・表を構築"""
+    df = pd.DataFrame(list(rows), columns=["モデル", "時間(秒)", "入力トークン", "出力トークン", "コスト(¥)"])
+
+    df["時間ラベル"] = df["時間(秒)"].apply(lambda x: f"{x:.2f}秒")
+    bars = alt.Chart(df).mark_bar().encode(
+        x=alt.X("モデル:N", sort=None, title=None),
+        y=alt.Y("時間(秒):Q", title="秒"),
+        color=alt.Color("モデル:N", legend=None),
+    )
+    time_chart = bars + bars.mark_text(dy=-10, fontSize=14).encode(text="時間ラベル:N")
+
+    df["コストラベル"] = df["コスト(¥)"].apply(lambda x: f"¥{x:.4f}")
+    bars = alt.Chart(df).mark_bar().encode(
+        x=alt.X("モデル:N", sort=None, title=None),
+        y=alt.Y("コスト(¥):Q", title="円"),
+        color=alt.Color("モデル:N", legend=None),
+    )
+    cost_chart = bars + bars.mark_text(dy=-10, fontSize=14).encode(text="コストラベル:N")
+
+    return df.drop(columns=["時間ラベル", "コストラベル"]), time_chart, cost_chart
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_comparison_charts(rows: tuple[tuple, ...]) -> tuple[pd.DataFrame, alt.LayerChart, alt.LayerChart]:
+    """完了した実行のグラフ・表を構築（同じデータでは再構築しない）"""
+    return make_comparison_charts(rows)
+
+def render_comparison_charts(run: dict, model_ids: list[str], key_suffix: str = "", cached: bool = True):
+    """保存済みの比較結果からグラフ・表を表示（APIは呼ばない）"""
+    # グラフ・表用データ
+    rows = []
+    for mid in model_ids:
+        m = MODELS_BY_ID.get(mid)
+        r = run["results"].get(mid)
+        if m is None or r is None:
+            continue
+        if not r.error:
+            rows.append((
+                m.name,
+                r.latency_ms / 1000,
+                r.input_tokens,
+                r.output_tokens,
+                r.calculate_cost(m.input_price, m.output_price) * USD_TO_JPY,
+            ))
+        else:
+            st.error(f"{m.name}: {r.error}")
+
+    if rows:
+        build = build_comparison_charts if cached else make_comparison_charts
+        df, time_chart, cost_chart = build(tuple(rows))
+
+        # グラフ表示
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("⏱️ レスポンス時間")
+            st.altair_chart(time_chart, width="stretch", key=f"time_chart_{key_suffix}")
+        with col2:
+            st.subheader("💰 コスト")
+            st.altair_chart(cost_chart, width="stretch", key=f"cost_chart_{key_suffix}")
+
+        # 表
+        st.dataframe(df.style.format({"時間(秒)": "{:.2f}", "コスト(¥)": "¥{:.4f}"}), width="stretch",
+            key=f"table_{key_suffix}")
+
+def render_response(m: ModelConfig, r: LLMResponse):
+    """1モデル分のレスポンスを表示"""
+    with st.expander(m.name, expanded=True):
+        if r.error:
+            st.error(r.error)
+        else:
+            st.text(r.content)
+
+def render_comparison_history():
+    """過去の比較結果を選択・絞り込みして表示"""
+    runs = get_comparison_runs()
+    if not runs:
+        return
+
+    st.divider()
+    run_ids = list(reversed(runs))
+    if st.session_state.get("compare_run_id") not in runs:
+        st.session_state["compare_run_id"] = run_ids[0]
+    run_id = st.selectbox("実行履歴", run_ids, format_func=lambda rid: get_run_label(runs[rid]), key="compare_run_id")
+    run = runs[run_id]
+
+    available = get_run_model_ids(run)
+    model_ids = st.multiselect("表示モデル", available, default=available,
+        format_func=lambda mid: MODELS_BY_ID[mid].name, key=f"compare_filter_{run_id}")
+
+    render_comparison_charts(run, model_ids, key_suffix=run_id)
+
+    # レスポンス表示
+    st.subheader("📝 レスポンス")
+    for mid in model_ids:
+        render_response(MODELS_BY_ID[mid], run["results"][mid])
+
 def main():
     render_sidebar()
     params = get_model_params()
@@ -237,70 +394,9 @@ def main():
 
         if st.button("比較実行", type="primary", key="run2"):
             if selected and prompt.strip():
-                results = {}
-                progress_bar = st.progress(0, text="準備中...")
-
-                for i, m in enumerate(selected):
-                    progress_bar.progress(i / len(selected), text=f"{m.name} 生成中... ({i+1}/{len(selected)})")
-                    results[m.id] = run_generation(m, prompt, params, system_prompt)
-
-                progress_bar.progress(1.0, text="完了")
-
-                # グラフ・表用データ
-                chart_data = []
-                for m in selected:
-                    r = results[m.id]
-                    if not r.error:
-                        row = {
-                            "モデル": m.name,
-                            "時間(秒)": r.latency_ms / 1000,
-                            "入力トークン": r.input_tokens,
-                            "出力トークン": r.output_tokens,
-                            "コスト(¥)": r.calculate_cost(m.input_price, m.output_price) * USD_TO_JPY,
-                        }
-                        chart_data.append(row)
-                    else:
-                        st.error(f"{m.name}: {r.error}")
-
-                if chart_data:
-                    df = pd.DataFrame(chart_data)
-
-                    # グラフ表示
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.subheader("⏱️ レスポンス時間")
-                        df["時間ラベル"] = df["時間(秒)"].apply(lambda x: f"{x:.2f}秒")
-                        bars = alt.Chart(df).mark_bar().encode(
-                            x=alt.X("モデル:N", sort=None, title=None),
-                            y=alt.Y("時間(秒):Q", title="秒"),
-                            color=alt.Color("モデル:N", legend=None),
-                        )
-                        text = bars.mark_text(dy=-10, fontSize=14).encode(text="時間ラベル:N")
-                        st.altair_chart(bars + text, width="stretch")
-
-                    with col2:
-                        st.subheader("💰 コスト")
-                        df["コストラベル"] = df["コスト(¥)"].apply(lambda x: f"¥{x:.4f}")
-                        bars = alt.Chart(df).mark_bar().encode(
-                            x=alt.X("モデル:N", sort=None, title=None),
-                            y=alt.Y("コスト(¥):Q", title="円"),
-                            color=alt.Color("モデル:N", legend=None),
-                        )
-                        text = bars.mark_text(dy=-10, fontSize=14).encode(text="コストラベル:N")
-                        st.altair_chart(bars + text, width="stretch")
-
-                    # 表
-                    st.dataframe(df.drop(columns=["時間ラベル", "コストラベル"]).style.format({"時間(秒)": "{:.2f}", "コスト(¥)": "¥{:.4f}"}), width="stretch")
-
-                # レスポンス表示
-                st.subheader("📝 レスポンス")
-                for m in selected:
-                    r = results[m.id]
-                    with st.expander(m.name, expanded=True):
-                        if r.error:
-                            st.error(r.error)
-                        else:
-                            st.text(r.content)
+                run_comparison(selected, prompt, params, system_prompt)
+
+        render_comparison_history()
 
 if __name__ == "__main__":
     main()